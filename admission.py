@@ -0,0 +1,155 @@
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, jsonify, request
+
+
+# Admission control and load shedding.
+#
+# Every endpoint belongs to a priority class (see @priority); unmarked ones
+# are "normal". Before a request runs it must pass three checks, using the
+# class limits unless the route overrides them:
+#
+#   queue time      how long it already waited before reaching the worker
+#                   (X-Request-Start from the proxy) plus how long it waits
+#                   here for a concurrency slot, against max_queue_ms
+#   rate            a per-route token bucket (rate per second, burst)
+#   concurrency     a per-route cap on requests running in this worker
+#
+# A request that fails any check gets an immediate 503 with Retry-After
+# instead of piling up behind a slow database. Shed counts are kept per
+# worker and reported at /health/admission.
+
+DEFAULT_CLASSES = {
+    'critical': {'max_concurrent': None, 'rate': None, 'burst': None, 'max_queue_ms': 5000},
+    'normal': {'max_concurrent': 16, 'rate': None, 'burst': None, 'max_queue_ms': 1000},
+    'bulk': {'max_concurrent': 2, 'rate': 5, 'burst': 10, 'max_queue_ms': 250},
+}
+
+_limits_lock = threading.Lock()
+_limits = {}
+_stats_lock = threading.Lock()
+_admitted = Counter()
+_shed = Counter()
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        # Returns 0 when a token was taken, else the seconds until one is free
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+class _RouteLimits:
+    def __init__(self, settings):
+        self.settings = settings
+        self.slots = threading.BoundedSemaphore(settings['max_concurrent']) if settings['max_concurrent'] else None
+        self.bucket = TokenBucket(settings['rate'], settings['burst']) if settings['rate'] else None
+
+
+def priority(name, **overrides):
+    def decorator(view):
+        view.admission = dict(overrides, priority=name)
+        return view
+    return decorator
+
+
+def _route_limits(endpoint):
+    limits = _limits.get(endpoint)
+    if limits is None:
+        with _limits_lock:
+            limits = _limits.get(endpoint)
+            if limits is None:
+                marks = getattr(current_app.view_functions.get(endpoint), 'admission', {})
+                settings = dict(current_app.config["ADMISSION_CLASSES"][marks.get('priority', 'normal')])
+                settings.update(marks)
+                limits = _limits[endpoint] = _RouteLimits(settings)
+    return limits
+
+
+def _queued_seconds():
+    # X-Request-Start: "t=<seconds|milliseconds|microseconds since epoch>"
+    value = request.headers.get('X-Request-Start', '').removeprefix('t=')
+    try:
+        started = float(value)
+    except ValueError:
+        return 0.0
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(0.0, time.time() - started)
+
+
+def _reject(endpoint, reason, retry_after):
+    with _stats_lock:
+        _shed[(endpoint, reason)] += 1
+    response = jsonify({'error': 'Server sedang sibuk, silakan coba lagi'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _admit():
+    endpoint = request.endpoint
+    if endpoint is None:
+        return None
+    limits = _route_limits(endpoint)
+    settings = limits.settings
+    budget = settings['max_queue_ms'] / 1000 - _queued_seconds()
+    if budget <= 0:
+        return _reject(endpoint, 'queue_time', current_app.config["ADMISSION_RETRY_AFTER"])
+
+    if limits.bucket is not None:
+        wait = limits.bucket.take()
+        if wait:
+            return _reject(endpoint, 'rate', wait)
+
+    if limits.slots is not None:
+        if not limits.slots.acquire(timeout=budget):
+            return _reject(endpoint, 'concurrency', current_app.config["ADMISSION_RETRY_AFTER"])
+        # Kept on the request, not g: /api/batch sub-requests share the app context
+        request.environ['admission.slots'] = limits.slots
+
+    with _stats_lock:
+        _admitted[endpoint] += 1
+    return None
+
+
+def _release(exc):
+    slots = request.environ.pop('admission.slots', None)
+    if slots is not None:
+        slots.release()
+
+
+def admission_stats():
+    with _stats_lock:
+        shed = {}
+        for (endpoint, reason), count in _shed.items():
+            shed.setdefault(endpoint, {})[reason] = count
+        return {'pid': os.getpid(), 'admitted': dict(_admitted), 'shed': shed}
+
+
+def configure_admission(app):
+    app.config.setdefault("ADMISSION", os.environ.get("ADMISSION", "1") != "0")
+    app.config.setdefault("ADMISSION_CLASSES", DEFAULT_CLASSES)
+    app.config.setdefault("ADMISSION_RETRY_AFTER", int(os.environ.get("ADMISSION_RETRY_AFTER", 2)))
+    if app.config["ADMISSION"]:
+        app.before_request(_admit)
+        app.teardown_request(_release)
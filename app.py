@@ -1,33 +1,140 @@
 import os
 
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from admission import configure_admission
+from replica import REPLICA_BIND, RoutingSession, configure_replica, watch_replica
+from singleflight import configure_single_flight
+from uploads import configure_uploads
+
 
 class Base(DeclarativeBase):
     pass
 
 
-db = SQLAlchemy(model_class=Base)
-# create the app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1) # needed for url_for to generate with https
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
+
+
+def database_url():
+    url = os.environ.get("DATABASE_URL")
+    if url:
+        return url
+
+    # fall back to the individual Neon/PostgreSQL credentials
+    parts = [os.environ.get(name) for name in ("PGUSER", "PGPASSWORD", "PGHOST", "PGPORT", "PGDATABASE")]
+    if all(parts):
+        return "postgresql://{}:{}@{}:{}/{}".format(*parts)
+    return None
+
+
+def create_app(config=None):
+    # Building the app must not touch the database: gunicorn imports this in
+    # every worker (or once in the master with --preload) before serving.
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET")
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1) # needed for url_for to generate with https
 
-# configure the database, relative to the app instance folder
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
-# initialize the app with the extension, flask-sqlalchemy >= 3.0.x
-db.init_app(app)
+    # configure the database, relative to the app instance folder
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url()
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+    if config:
+        app.config.update(config)
+    # optional read replica for GET requests, see replica.py
+    configure_replica(app)
+    # coalesce identical concurrent GETs, see singleflight.py
+    configure_single_flight(app)
+    # shed load before it reaches the database, see admission.py
+    configure_admission(app)
+    # verification document storage, see uploads.py
+    configure_uploads(app)
+    # initialize the app with the extension, flask-sqlalchemy >= 3.0.x
+    db.init_app(app)
 
-with app.app_context():
-    # Make sure to import the models here or their tables won't be created
+    # Make sure to import the models here or their tables won't be known
     import models  # noqa: F401
-    import routes  # noqa: F401
+    from routes import bp
+
+    app.register_blueprint(bp)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(sync_replica_command)
+    app.cli.add_command(refresh_rollups_command)
+    app.cli.add_command(settle_command)
+
+    with app.app_context():
+        watch_replica(db)
+
+    return app
+
+
+def init_db():
+    db.create_all(bind_key=None)
+    # create_all skips existing tables, so add indexes declared since then
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def sync_replica():
+    # Local testing only: a real replica is kept current by the database
+    engine = db.engines[REPLICA_BIND]
+    db.metadata.create_all(engine)
+    with db.engine.connect() as source, engine.begin() as target:
+        for table in reversed(db.metadata.sorted_tables):
+            target.execute(table.delete())
+        for table in db.metadata.sorted_tables:
+            rows = source.execute(table.select()).mappings().all()
+            if rows:
+                target.execute(table.insert(), [dict(row) for row in rows])
+
+
+@click.command("init-db")
+def init_db_command():
+    """Create any missing tables on the primary database."""
+    init_db()
+    click.echo("Database tables created.")
+
+
+@click.command("sync-replica")
+def sync_replica_command():
+    """Copy every table from the primary into DATABASE_REPLICA_URL (local testing)."""
+    if REPLICA_BIND not in db.engines:
+        raise click.ClickException("DATABASE_REPLICA_URL is not set")
+    sync_replica()
+    click.echo("Replica synced from primary.")
+
+
+@click.command("refresh-rollups")
+@click.option("--batch-size", default=50000, show_default=True)
+def refresh_rollups_command(batch_size):
+    """Fold new pesanan and saldo rows into the reporting rollups."""
+    from rollups import refresh_rollups
+
+    for name, count in refresh_rollups(batch_size).items():
+        click.echo(f"{name}: {count} rows folded")
+
+
+@click.command("settle")
+@click.option("--batch-size", default=5000, show_default=True)
+def settle_command(batch_size):
+    """Post ledger rows for completed pesanan that are not settled yet."""
+    from settlement import run_settlement
+
+    result = run_settlement(batch_size)
+    click.echo(f"Run {result['id_run']}: {result['pesanan']} pesanan, "
+               f"jumlah {result['jumlah']}, biaya platform {result['biaya_platform']}")
+    if result['tanpa_budget']:
+        click.echo(f"{result['tanpa_budget']} selesai pesanan skipped: no estimasi_budget", err=True)
+
 
-    db.create_all()
\ No newline at end of file
+def dispose_engines(app):
+    # Pooled connections must not be shared across a fork
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
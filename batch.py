@@ -0,0 +1,106 @@
+import os
+
+from flask import current_app, request
+
+from serializers import dumps
+
+
+# Batched sub-requests for /api/batch.
+#
+# Each sub-request is dispatched through the normal Flask machinery
+# (routing, admission, views, after_request) in a nested request context
+# that shares the batch's app context, and so its database session and
+# connection. With "parallel": true and only GET sub-requests, they run on
+# a small thread pool instead, each thread with its own app context.
+# Only JSON and text bodies fit in the combined response; a sub-request that
+# returns a file (e.g. /api/dokumen/<id>) gets a 415 entry instead.
+
+MAX_SUB_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", 20))
+MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", 4))
+
+# Headers that describe the batch request rather than the sub-request; the
+# batch's queue time is checked once when /api/batch itself is admitted, so
+# earlier sub-requests' run time must not count as later ones' queue time
+_SKIP_HEADERS = {'Content-Length', 'Content-Type', 'X-Request-Start'}
+
+# Sub-response headers a client needs to act on, copied into the envelope
+_KEEP_HEADERS = ('Retry-After', 'Location')
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_batch(data):
+    if not isinstance(data, dict):
+        raise BatchError('Body harus berupa objek JSON')
+    subrequests = data.get('requests')
+    if not isinstance(subrequests, list) or not subrequests:
+        raise BatchError('Daftar requests wajib diisi')
+    if len(subrequests) > MAX_SUB_REQUESTS:
+        raise BatchError(f'Maksimal {MAX_SUB_REQUESTS} requests per batch')
+
+    parsed = []
+    for sub in subrequests:
+        if not isinstance(sub, dict) or not isinstance(sub.get('path'), str):
+            raise BatchError('Setiap request harus memiliki path')
+        path = sub['path']
+        if not path.startswith('/api/') or path.split('?')[0].rstrip('/') == '/api/batch':
+            raise BatchError(f'Path tidak didukung: {path}')
+        method = sub.get('method', 'GET')
+        if not isinstance(method, str):
+            raise BatchError(f'Method tidak valid untuk {path}')
+        parsed.append((method.upper(), path, sub.get('body')))
+    return parsed
+
+
+def _as_bytes(data):
+    # dumps() returns bytes with orjson and str with the stdlib fallback
+    return data.encode() if isinstance(data, str) else data
+
+
+def _envelope(status, body, headers=None):
+    return b'{"status":%d,"headers":%s,"body":%s}' % (status, _as_bytes(dumps(headers or {})), _as_bytes(body))
+
+
+def _dispatch(app, headers, method, path, body):
+    with app.test_request_context(path, method=method, headers=headers, json=body):
+        response = None
+        try:
+            response = app.full_dispatch_request()
+            if response.is_json and not response.direct_passthrough:
+                data = response.get_data()
+            elif response.mimetype.startswith('text/') and not response.direct_passthrough:
+                data = dumps(response.get_data(as_text=True))
+            else:
+                return _envelope(415, b'{"error":"Respons berupa file, ambil langsung tanpa batch"}')
+            kept = {name: response.headers[name] for name in _KEEP_HEADERS if name in response.headers}
+            return _envelope(response.status_code, data, kept)
+        except Exception:
+            app.logger.exception("Sub-request %s %s gagal", method, path)
+            return _envelope(500, b'{"error":"Terjadi kesalahan"}')
+        finally:
+            if response is not None:
+                # Releases file handles of send_file responses
+                response.close()
+
+
+def _dispatch_in_thread(app, headers, method, path, body):
+    with app.app_context():
+        return _dispatch(app, headers, method, path, body)
+
+
+def run_batch(subrequests, parallel=False):
+    app = current_app._get_current_object()
+    headers = [(k, v) for k, v in request.headers if k not in _SKIP_HEADERS]
+
+    if parallel and all(method == 'GET' for method, _, _ in subrequests):
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(subrequests))) as pool:
+            parts = list(pool.map(lambda sub: _dispatch_in_thread(app, headers, *sub), subrequests))
+    else:
+        parts = [_dispatch(app, headers, *sub) for sub in subrequests]
+
+    # Sub-responses are already JSON, so splice them instead of re-encoding
+    return b'{"responses":[' + b','.join(parts) + b']}'
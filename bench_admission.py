@@ -0,0 +1,153 @@
+# Latency of the critical endpoints while bulk endpoints are saturated.
+#
+#   python bench_admission.py
+#
+# Seeds a temporary SQLite database, then for ADMISSION=0 and ADMISSION=1
+# starts gunicorn with gunicorn.conf.py (threaded workers) and runs
+# BENCH_BULK_CLIENTS clients in a loop on the bulk list and report endpoints
+# while BENCH_CRITICAL_CLIENTS clients alternate POST /api/login and
+# POST /api/pesanan. Reports p50/p99 per critical endpoint and the bulk
+# status mix. Clients send no X-Request-Start, so only the concurrency caps
+# and rate limits can shed; BENCH_REQUEST_START=1 adds the header like a
+# proxy would.
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from datetime import datetime, timedelta
+
+ROWS = int(os.environ.get("BENCH_ROWS", 20000))
+SECONDS = float(os.environ.get("BENCH_SECONDS", 20))
+BULK_CLIENTS = int(os.environ.get("BENCH_BULK_CLIENTS", 16))
+CRITICAL_CLIENTS = int(os.environ.get("BENCH_CRITICAL_CLIENTS", 2))
+REQUEST_START = os.environ.get("BENCH_REQUEST_START") == "1"
+
+BULK_PATHS = ['/api/pesanan', '/api/users', '/api/mitra/unverified', '/api/reports/harian']
+
+
+def seed(url):
+    os.environ["DATABASE_URL"] = url
+    from werkzeug.security import generate_password_hash
+
+    from app import create_app, db, init_db
+    from models import User, Pesanan
+
+    app = create_app()
+    with app.app_context():
+        init_db()
+        now = datetime.utcnow()
+        db.session.execute(db.insert(User), [
+            {'email': 'bench-user@example.com', 'password': generate_password_hash('bench'),
+             'nama_lengkap': 'Bench User', 'role': 'user', 'created_at': now},
+            {'email': 'bench-mitra@example.com', 'password': 'x', 'nama_lengkap': 'Bench Mitra',
+             'role': 'mitra', 'status_verifikasi': 'terverifikasi', 'created_at': now},
+        ] + [
+            {'email': f'user{i}@example.com', 'password': 'x', 'nama_lengkap': f'User {i}', 'role': 'user',
+             'created_at': now}
+            for i in range(ROWS)
+        ])
+        db.session.execute(db.insert(Pesanan), [
+            {'id_user': 1, 'id_mitra': 2, 'jenis_layanan': 'Cleaning', 'deskripsi': 'bench', 'alamat': 'bench',
+             'waktu_diinginkan': now + timedelta(days=1), 'estimasi_budget': 100000,
+             'status': 'menunggu_konfirmasi', 'waktu_pesan': now, 'created_at': now}
+            for _ in range(ROWS)
+        ])
+        db.session.commit()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def call(base, path, payload=None):
+    headers = {'Content-Type': 'application/json'}
+    if REQUEST_START:
+        headers['X-Request-Start'] = f"t={time.time() * 1000:.0f}"
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(base + path, data=data, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def run(url, admission):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=url, ADMISSION=admission, SINGLE_FLIGHT="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--preload", "main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                call(base, '/health')
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        deadline = time.monotonic() + SECONDS
+        latencies = {'login': [], 'pesanan': []}
+        statuses = {'login': Counter(), 'pesanan': Counter(), 'bulk': Counter()}
+        lock = threading.Lock()
+
+        def bulk(n):
+            i = n
+            while time.monotonic() < deadline:
+                status, _ = call(base, BULK_PATHS[i % len(BULK_PATHS)])
+                i += 1
+                with lock:
+                    statuses['bulk'][status] += 1
+
+        def critical():
+            order = {'id_user': 1, 'id_mitra': 2, 'jenis_layanan': 'Cleaning', 'deskripsi': 'bench',
+                     'alamat': 'bench', 'waktu_diinginkan': '2030-01-01T09:00:00', 'estimasi_budget': 100000}
+            while time.monotonic() < deadline:
+                for name, path, payload in (
+                    ('login', '/api/login', {'email': 'bench-user@example.com', 'password': 'bench'}),
+                    ('pesanan', '/api/pesanan', order),
+                ):
+                    status, elapsed = call(base, path, payload)
+                    with lock:
+                        latencies[name].append(elapsed)
+                        statuses[name][status] += 1
+
+        threads = [threading.Thread(target=bulk, args=(n,)) for n in range(BULK_CLIENTS)]
+        threads += [threading.Thread(target=critical) for _ in range(CRITICAL_CLIENTS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"ADMISSION={admission}")
+    for name, values in latencies.items():
+        values.sort()
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        print(f"  {name:<8} n={len(values):>5}  p50 {statistics.median(values) * 1000:8.1f} ms  "
+              f"p99 {p99 * 1000:8.1f} ms  {dict(statuses[name])}")
+    print(f"  bulk     {dict(statuses['bulk'])}")
+
+
+if __name__ == '__main__':
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_admission.db')}"
+    seed(url)
+    for admission in ("0", "1"):
+        run(url, admission)
@@ -0,0 +1,79 @@
+# Micro-benchmark for the list endpoints: rows serialized per second.
+#
+#   python bench_serializers.py
+#
+# Seeds an in-memory SQLite database and times each GET endpoint end to end
+# through the test client (query, row conversion and JSON encoding).
+import os
+import time
+from datetime import datetime, timedelta
+
+ROWS = int(os.environ.get("BENCH_ROWS", 5000))
+RUNS = int(os.environ.get("BENCH_RUNS", 5))
+
+
+def seed(db, User, Pesanan, Saldo, Chat):
+    now = datetime.utcnow()
+    users = [
+        {'email': f'user{i}@example.com', 'password': 'x', 'nama_lengkap': f'User {i}',
+         'role': 'mitra' if i % 2 else 'user',
+         'status_verifikasi': 'terverifikasi' if i % 4 == 1 else ('menunggu_verifikasi' if i % 2 else None),
+         'created_at': now}
+        for i in range(1, ROWS + 1)
+    ]
+    db.session.execute(db.insert(User), users)
+    db.session.execute(db.insert(Pesanan), [
+        {'id_user': 2, 'id_mitra': 1, 'jenis_layanan': 'Cleaning', 'deskripsi': 'Pembersihan rumah',
+         'alamat': 'Jl. Merdeka No. 123', 'waktu_diinginkan': now + timedelta(days=1),
+         'estimasi_budget': 100000, 'status': 'menunggu_konfirmasi', 'waktu_pesan': now, 'created_at': now}
+        for _ in range(ROWS)
+    ])
+    db.session.execute(db.insert(Saldo), [
+        {'id_user': 2, 'jumlah': 10000, 'jenis_transaksi': 'topup', 'deskripsi': 'Top up', 'created_at': now}
+        for _ in range(ROWS)
+    ])
+    db.session.execute(db.insert(Chat), [
+        {'id_pesanan': 1, 'id_pengirim': 2, 'pesan': 'Halo', 'created_at': now}
+        for _ in range(ROWS)
+    ])
+    db.session.commit()
+
+
+ENDPOINTS = [
+    '/api/users',
+    '/api/mitra/verified',
+    '/api/mitra/unverified',
+    '/api/pesanan',
+    '/api/pesanan/user/2',
+    '/api/pesanan/mitra/1',
+    '/api/saldo',
+    '/api/chat',
+]
+
+
+if __name__ == '__main__':
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+    # Measure serialization, not the rate limits on bulk endpoints
+    os.environ["ADMISSION"] = "0"
+
+    from app import create_app, db
+    from models import User, Pesanan, Saldo, Chat
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(db, User, Pesanan, Saldo, Chat)
+
+    client = app.test_client()
+    for url in ENDPOINTS:
+        if client.get(url).status_code == 404:
+            continue
+        best = None
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        rows = len(response.get_json()['data'])
+        print(f"{url:<24} {rows:>6} rows  {best * 1000:8.1f} ms  {rows / best:>10,.0f} rows/s")
@@ -0,0 +1,58 @@
+# Benchmark for the batch settlement run.
+#
+#   python bench_settlement.py
+#   DATABASE_URL=postgresql://... BENCH_ORDERS=500000 python bench_settlement.py
+#
+# Without DATABASE_URL a temporary SQLite file is used. The benchmark seeds
+# completed pesanan, settles them, then runs again to check that nothing
+# settles twice.
+import os
+import tempfile
+import time
+from datetime import datetime
+
+ORDERS = int(os.environ.get("BENCH_ORDERS", 200000))
+BATCH = int(os.environ.get("BENCH_BATCH", 5000))
+
+
+if __name__ == '__main__':
+    if not os.environ.get("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(), "bench_settlement.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from app import create_app, db, init_db
+    from models import User, Pesanan, Saldo
+    from settlement import run_settlement
+
+    app = create_app()
+    with app.app_context():
+        init_db()
+        db.session.execute(db.insert(User), [
+            {'email': f'bench-user-{os.getpid()}@example.com', 'password': 'x', 'nama_lengkap': 'Bench User', 'role': 'user'},
+            {'email': f'bench-mitra-{os.getpid()}@example.com', 'password': 'x', 'nama_lengkap': 'Bench Mitra', 'role': 'mitra'},
+        ])
+        id_user, id_mitra = db.session.scalars(
+            db.select(User.id).where(User.nama_lengkap.in_(['Bench User', 'Bench Mitra'])).order_by(User.id.desc()).limit(2)
+        ).all()[::-1]
+
+        now = datetime.utcnow()
+        for start in range(0, ORDERS, 50000):
+            db.session.execute(db.insert(Pesanan), [
+                {'id_user': id_user, 'id_mitra': id_mitra, 'jenis_layanan': 'Cleaning', 'deskripsi': 'bench',
+                 'alamat': 'bench', 'waktu_diinginkan': now, 'estimasi_budget': 100000 + i % 1000,
+                 'status': 'selesai' if i % 10 else 'dikonfirmasi', 'waktu_pesan': now, 'created_at': now}
+                for i in range(start, min(start + 50000, ORDERS))
+            ])
+        db.session.commit()
+        ledger_before = db.session.scalar(db.select(db.func.count(Saldo.id)))
+
+        start = time.perf_counter()
+        result = run_settlement(BATCH)
+        elapsed = time.perf_counter() - start
+        print(f"settled {result['pesanan']:,} pesanan in {elapsed:.2f} s "
+              f"({result['pesanan'] / elapsed:,.0f} pesanan/s, batch {BATCH})")
+        print(f"ledger rows written: {db.session.scalar(db.select(db.func.count(Saldo.id))) - ledger_before:,}")
+
+        start = time.perf_counter()
+        again = run_settlement(BATCH)
+        print(f"second run settled {again['pesanan']} pesanan in {time.perf_counter() - start:.2f} s")
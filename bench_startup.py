@@ -0,0 +1,60 @@
+# Measures app cold start and worker spawn time.
+#
+#   DATABASE_URL=postgresql://... python bench_startup.py
+#
+# "cold start" imports main.py in a fresh interpreter, like a new autoscale
+# instance or a gunicorn worker without --preload. "preload spawn" forks from
+# a parent that already built the app, like gunicorn --preload, and measures
+# until the child has served its first request.
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = int(os.environ.get("BENCH_RUNS", 10))
+
+COLD_START = """
+import time
+t = time.perf_counter()
+import main
+print(time.perf_counter() - t)
+"""
+
+
+def cold_start():
+    out = subprocess.run([sys.executable, "-c", COLD_START], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def preload_spawn(app):
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        from app import dispose_engines
+
+        dispose_engines(app)
+        app.test_client().get('/health')
+        os.write(write_fd, b"x")
+        os._exit(0)
+    os.close(write_fd)
+    os.read(read_fd, 1)
+    elapsed = time.perf_counter() - start
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    return elapsed
+
+
+def report(name, samples):
+    print(f"{name:<15} median {statistics.median(samples) * 1000:8.1f} ms   "
+          f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    report("cold start", [cold_start() for _ in range(RUNS)])
+
+    from main import app
+
+    report("preload spawn", [preload_spawn(app) for _ in range(RUNS)])
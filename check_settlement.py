@@ -0,0 +1,101 @@
+# Checks the amounts written by a settlement run against a local SQLite file.
+#
+#   python check_settlement.py
+#
+# Seeds completed pesanan (including one without a budget and one with a
+# budget of 0), settles them without and then with
+# SETTLEMENT_PLATFORM_USER_ID, and checks every ledger row, the run totals,
+# the tanpa_budget count and that a repeated run writes nothing. Exits
+# non-zero on the first failed check.
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+
+def check(label, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/settlement.db"
+    os.environ["SETTLEMENT_FEE_PERCENT"] = "10"
+    os.environ.pop("SETTLEMENT_PLATFORM_USER_ID", None)
+
+    from app import create_app, db, init_db
+    from models import User, Pesanan, Saldo, Pencairan
+    from settlement import run_settlement
+
+    def ledger():
+        return sorted(tuple(row) for row in db.session.execute(
+            db.select(Saldo.deskripsi, Saldo.id_user, Saldo.jenis_transaksi, Saldo.jumlah)
+        ))
+
+    def order(budget, status='selesai'):
+        pesanan = Pesanan(id_user=id_user, id_mitra=id_mitra, jenis_layanan='Cleaning', deskripsi='check',
+                          alamat='check', waktu_diinginkan=datetime.utcnow(), estimasi_budget=budget, status=status)
+        db.session.add(pesanan)
+        db.session.flush()
+        return pesanan.id
+
+    app = create_app()
+    with app.app_context():
+        init_db()
+        users = [User(email=f'{role}@example.com', password='x', nama_lengkap=role, role=role)
+                 for role in ('user', 'mitra', 'platform')]
+        db.session.add_all(users)
+        db.session.flush()
+        id_user, id_mitra, id_platform = (u.id for u in users)
+
+        full = order(100000)
+        odd = order(12345)
+        no_budget = order(None)
+        zero = order(0)
+        order(50000, status='dikonfirmasi')
+        db.session.commit()
+
+        result = run_settlement(batch_size=2)
+        check("settles the orders with a budget", result['pesanan'] == 3)
+        check("run totals", (result['jumlah'], result['biaya_platform']) == (112345, 11234))
+        check("reports the order without a budget", result['tanpa_budget'] == 1)
+        check("order without a budget is not claimed", db.session.get(Pencairan, no_budget) is None)
+        check("zero budget is claimed with zero amounts",
+              (db.session.get(Pencairan, zero).jumlah, db.session.get(Pencairan, zero).biaya_platform) == (0, 0))
+        check("ledger rows without a platform user", ledger() == sorted([
+            (f'Pembayaran pesanan #{full}', id_user, 'pembayaran', -100000),
+            (f'Pendapatan pesanan #{full}', id_mitra, 'pendapatan', 90000),
+            (f'Pembayaran pesanan #{odd}', id_user, 'pembayaran', -12345),
+            (f'Pendapatan pesanan #{odd}', id_mitra, 'pendapatan', 11111),
+        ]))
+
+        before = ledger()
+        again = run_settlement(batch_size=2)
+        check("second run settles nothing", (again['pesanan'], again['jumlah'], again['biaya_platform']) == (0, 0, 0))
+        check("second run writes no ledger rows", ledger() == before)
+        check("order without a budget is still reported", again['tanpa_budget'] == 1)
+
+        os.environ["SETTLEMENT_PLATFORM_USER_ID"] = str(id_platform)
+        db.session.get(Pesanan, no_budget).estimasi_budget = 30000
+        later = order(20000)
+        db.session.commit()
+
+        result = run_settlement(batch_size=2)
+        check("settles the filled-in budget and the new order", result['pesanan'] == 2)
+        check("run totals with a platform user", (result['jumlah'], result['biaya_platform']) == (50000, 5000))
+        check("nothing left without a budget", result['tanpa_budget'] == 0)
+        check("ledger rows with a platform user", ledger() == sorted(before + [
+            (f'Pembayaran pesanan #{no_budget}', id_user, 'pembayaran', -30000),
+            (f'Pendapatan pesanan #{no_budget}', id_mitra, 'pendapatan', 27000),
+            (f'Biaya platform pesanan #{no_budget}', id_platform, 'biaya_platform', 3000),
+            (f'Pembayaran pesanan #{later}', id_user, 'pembayaran', -20000),
+            (f'Pendapatan pesanan #{later}', id_mitra, 'pendapatan', 18000),
+            (f'Biaya platform pesanan #{later}', id_platform, 'biaya_platform', 2000),
+        ]))
+
+        before = ledger()
+        again = run_settlement(batch_size=2)
+        check("repeated run with a platform user writes nothing", again['pesanan'] == 0 and ledger() == before)
+    print(f"database in {workdir}")
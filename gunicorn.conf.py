@@ -0,0 +1,19 @@
+# Loaded automatically by gunicorn from the working directory.
+#
+# With `--preload` the app is built once in the master and workers fork from
+# it copy-on-write; creating the app never opens a database connection, but
+# drop any pooled connections anyway so no socket is shared between workers.
+#
+# Workers are threaded: admission control's per-route concurrency caps and
+# in-worker request coalescing only take effect when a worker serves
+# several requests at once (see admission.py and singleflight.py).
+import os
+
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+
+def post_fork(server, worker):
+    from app import dispose_engines
+
+    dispose_engines(worker.app.wsgi())
@@ -1,9 +1,10 @@
-from app import app, db
+from app import create_app, db
 from models import User, Pesanan, Saldo, Chat
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
 
 def create_test_data():
+    app = create_app()
     with app.app_context():
         # Clear existing data
         db.drop_all()
@@ -1 +1,3 @@
-from app import app  # noqa: F401
\ No newline at end of file
+from app import create_app
+
+app = create_app()
@@ -1,5 +1,26 @@
 from app import db
 from datetime import datetime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+# Current UTC time on the database clock. Rollups compare created_at of rows
+# written by different app instances, so these columns must not depend on
+# each instance's own clock.
+class utcnow(FunctionElement):
+    type = db.DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
 
 
 class User(db.Model):
@@ -28,7 +49,7 @@ class Pesanan(db.Model):
     estimasi_budget = db.Column(db.Integer, default=None)
     status = db.Column(db.String(50), nullable=False, default='menunggu_konfirmasi')
     waktu_pesan = db.Column(db.DateTime, default=datetime.utcnow)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow())
     
     # Relationships
     user = db.relationship('User', foreign_keys=[id_user], backref='pesanan_user')
@@ -43,7 +64,7 @@ class Saldo(db.Model):
     jumlah = db.Column(db.Integer, nullable=False)
     jenis_transaksi = db.Column(db.String(50), nullable=False)
     deskripsi = db.Column(db.String(255), default=None)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow())
     
     # Relationships
     user = db.relationship('User', backref='saldo_records')
@@ -60,4 +81,73 @@ class Chat(db.Model):
     
     # Relationships
     pesanan = db.relationship('Pesanan', backref='chat_messages')
-    pengirim = db.relationship('User', backref='sent_messages')
\ No newline at end of file
+    pengirim = db.relationship('User', backref='sent_messages')
+
+
+# Settlement scans completed pesanan in id order
+db.Index('ix_pesanan_status_id', Pesanan.status, Pesanan.id)
+
+# Reporting rollups, maintained by rollups.refresh_rollups()
+class RekapLayanan(db.Model):
+    __tablename__ = 'rekap_layanan_harian'
+    
+    tanggal = db.Column(db.Date, primary_key=True)
+    jenis_layanan = db.Column(db.String(100), primary_key=True)
+    jumlah_pesanan = db.Column(db.Integer, nullable=False, default=0)
+    total_budget = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class RekapMitra(db.Model):
+    __tablename__ = 'rekap_mitra_harian'
+    
+    tanggal = db.Column(db.Date, primary_key=True)
+    id_mitra = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    jumlah_pesanan = db.Column(db.Integer, nullable=False, default=0)
+    total_budget = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class RekapSaldo(db.Model):
+    __tablename__ = 'rekap_saldo_harian'
+    
+    tanggal = db.Column(db.Date, primary_key=True)
+    id_user = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    jenis_transaksi = db.Column(db.String(50), primary_key=True)
+    jumlah_transaksi = db.Column(db.Integer, nullable=False, default=0)
+    total_jumlah = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class RekapWatermark(db.Model):
+    __tablename__ = 'rekap_watermark'
+    
+    nama = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=utcnow(), onupdate=utcnow())
+
+
+# One row per settled pesanan; the primary key makes settlement idempotent
+class Pencairan(db.Model):
+    __tablename__ = 'pencairan'
+    
+    id_pesanan = db.Column(db.Integer, db.ForeignKey('pesanan.id'), primary_key=True)
+    id_run = db.Column(db.String(36), nullable=False, index=True)
+    id_user = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    id_mitra = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    jumlah = db.Column(db.Integer, nullable=False)
+    biaya_platform = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Mitra verification documents; the file itself is stored once per sha256 (see uploads.py)
+class DokumenVerifikasi(db.Model):
+    __tablename__ = 'dokumen_verifikasi'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    id_user = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    nama_file = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100), nullable=False)
+    ukuran = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    user = db.relationship('User', backref='dokumen_verifikasi')
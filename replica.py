@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+
+
+# Read-replica routing.
+#
+# GET/HEAD requests read from the "replica" bind (DATABASE_REPLICA_URL) while
+# everything else, and every write, goes to the primary. A client that wrote
+# recently carries a short-lived cookie that pins its reads to the primary so
+# it always sees its own writes. The replica is skipped when it lags too far
+# behind or cannot be reached, and is retried after a cooldown. A read that
+# fails on the replica for any reason is retried once on the primary.
+
+REPLICA_BIND = 'replica'
+PIN_COOKIE = 'db_pin'
+
+_READ_METHODS = ('GET', 'HEAD')
+
+_state_lock = threading.Lock()
+_state = {
+    'checked_at': 0.0,
+    'healthy': True,
+    'lag': 0.0,
+}
+
+
+def configure_replica(app):
+    replica_url = os.environ.get("DATABASE_REPLICA_URL")
+    if replica_url:
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        binds[REPLICA_BIND] = {
+            "url": replica_url,
+            "pool_recycle": 300,
+            "pool_pre_ping": True,
+        }
+
+    app.config.setdefault("REPLICA_MAX_LAG_SECONDS", float(os.environ.get("REPLICA_MAX_LAG_SECONDS", 5)))
+    app.config.setdefault("REPLICA_CHECK_INTERVAL", float(os.environ.get("REPLICA_CHECK_INTERVAL", 5)))
+    app.config.setdefault("REPLICA_RETRY_SECONDS", float(os.environ.get("REPLICA_RETRY_SECONDS", 30)))
+    # Should be comfortably above REPLICA_MAX_LAG_SECONDS
+    app.config.setdefault("REPLICA_STICKY_SECONDS", float(os.environ.get("REPLICA_STICKY_SECONDS", 10)))
+
+    app.after_request(_pin_after_write)
+
+
+def _pin_after_write(response):
+    if g.get('db_wrote'):
+        sticky = current_app.config["REPLICA_STICKY_SECONDS"]
+        response.set_cookie(PIN_COOKIE, str(time.time() + sticky), max_age=int(sticky) + 1, httponly=True, samesite='Lax')
+    return response
+
+
+def is_pinned():
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _replica_lag(engine):
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+    with engine.connect() as conn:
+        # Having replayed everything received only means "current" while the
+        # WAL stream is alive and has heard from the primary recently (an idle
+        # primary still sends keepalives); otherwise fall back to the age of
+        # the last replayed commit, which grows until the replica is skipped.
+        # Reading pg_stat_wal_receiver needs pg_read_all_stats.
+        lag = conn.execute(text(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+            "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AND EXISTS ("
+            "  SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming' "
+            "  AND last_msg_receipt_time > now() - current_setting('wal_receiver_timeout')::interval"
+            ") THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )).scalar()
+    return float(lag or 0)
+
+
+def replica_available(engine):
+    config = current_app.config
+    now = time.monotonic()
+    interval = config["REPLICA_CHECK_INTERVAL"] if _state['healthy'] else config["REPLICA_RETRY_SECONDS"]
+    if now - _state['checked_at'] >= interval and _state_lock.acquire(blocking=False):
+        # Only one thread probes; the others keep using the last known state
+        try:
+            try:
+                _state['lag'] = _replica_lag(engine)
+                _state['healthy'] = True
+            except Exception:
+                current_app.logger.warning("Replica tidak dapat dijangkau, membaca dari primary")
+                _state['healthy'] = False
+            _state['checked_at'] = time.monotonic()
+        finally:
+            _state_lock.release()
+    return _state['healthy'] and _state['lag'] <= config["REPLICA_MAX_LAG_SECONDS"]
+
+
+def watch_replica(db):
+    engine = db.engines.get(REPLICA_BIND)
+    if engine is None:
+        return
+
+    @event.listens_for(engine, 'handle_error')
+    def _replica_error(context):
+        # Any replica error (dropped connection, recovery conflict, missing
+        # table) sends reads back to the primary until the next probe
+        with _state_lock:
+            _state['healthy'] = False
+            _state['checked_at'] = time.monotonic()
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, replica=True, **kwargs):
+        if bind is None and replica and self._reads_from_replica(clause):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None and replica_available(engine):
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if not has_request_context() or request.method not in _READ_METHODS:
+            return False
+        if self._flushing or self.new or self.dirty or self.deleted:
+            return False
+        if clause is not None and getattr(clause, 'is_dml', False):
+            return False
+        return not (g.get('db_wrote') or is_pinned())
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _retry_on_primary(state):
+    session = state.session
+    replica = session._db.engines.get(REPLICA_BIND)
+    if replica is None or session.get_bind(**state.bind_arguments) is not replica:
+        return None
+    try:
+        return state.invoke_statement()
+    except DBAPIError as exc:
+        current_app.logger.warning("Query gagal di replica, diulang di primary: %s", exc.orig)
+        # The failed replica transaction is unusable; a read-only session has
+        # nothing to lose by starting over
+        session.rollback()
+        return state.invoke_statement(bind_arguments={'replica': False})
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _record_write(session, flush_context):
+    if has_request_context():
+        g.db_wrote = True
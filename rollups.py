@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import and_, func, select
+
+from app import db
+from models import Pesanan, Saldo, RekapLayanan, RekapMitra, RekapSaldo, RekapWatermark, utcnow
+
+
+# Incremental reporting rollups.
+#
+# Each source table has a high-water mark (the last id folded into the
+# rollups). A refresh aggregates only the rows above the mark, adds the
+# per-day totals onto the rollup rows and advances the mark in the same
+# transaction, so it can be run as often as wanted and resumes where it
+# stopped. Report endpoints read the rollup tables only.
+#
+# Ids are handed out at insert but rows only become visible at commit, so a
+# lower id can still be in flight when a higher one is already readable.
+# A refresh therefore stops before the first row created less than
+# ROLLUP_SETTLE_SECONDS ago; the margin must exceed the longest write
+# transaction or its rows are skipped for good. created_at and the cutoff
+# both come from the database clock (models.utcnow), so skew between app
+# instances cannot move rows across the margin.
+#
+# Report reads start a refresh in the background once the rollups are older
+# than ROLLUP_MAX_AGE_SECONDS; the read that notices is served the previous
+# totals. The refresh-rollups command can also run on a schedule.
+#
+# Rows are counted once, as inserted: order totals are orders placed per
+# day with the budget given at the time, whatever their status is now.
+# Later status changes (dibatalkan, selesai) and budget edits are not
+# reflected; settled amounts are in the ledger (rekap_saldo_harian).
+
+_ORDER_MEASURES = {
+    'jumlah_pesanan': func.count(Pesanan.id),
+    'total_budget': func.coalesce(func.sum(Pesanan.estimasi_budget), 0),
+}
+
+SOURCES = {
+    'pesanan': (Pesanan, func.coalesce(Pesanan.waktu_pesan, Pesanan.created_at), [
+        (RekapLayanan, {'jenis_layanan': Pesanan.jenis_layanan}, _ORDER_MEASURES),
+        (RekapMitra, {'id_mitra': Pesanan.id_mitra}, _ORDER_MEASURES),
+    ]),
+    'saldo': (Saldo, Saldo.created_at, [
+        (RekapSaldo, {'id_user': Saldo.id_user, 'jenis_transaksi': Saldo.jenis_transaksi}, {
+            'jumlah_transaksi': func.count(Saldo.id),
+            'total_jumlah': func.coalesce(func.sum(Saldo.jumlah), 0),
+        }),
+    ]),
+}
+
+
+_refresh_lock = threading.Lock()
+_state = {'checked_at': float('-inf')}
+
+
+def _settle_seconds():
+    return int(os.environ.get("ROLLUP_SETTLE_SECONDS", 60))
+
+
+def _max_age_seconds():
+    return int(os.environ.get("ROLLUP_MAX_AGE_SECONDS", 300))
+
+
+def _as_date(value):
+    # SQLite returns DATE() as text
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _watermark(name):
+    mark = db.session.execute(
+        select(RekapWatermark).where(RekapWatermark.nama == name).with_for_update()
+    ).scalar_one_or_none()
+    if mark is None:
+        mark = RekapWatermark(nama=name, last_id=0)
+        db.session.add(mark)
+        db.session.flush()
+    return mark
+
+
+def _fold(rollup, tanggal, keys, measures, window):
+    key_names = list(keys)
+    measure_names = list(measures)
+    rows = db.session.execute(
+        select(func.date(tanggal), *keys.values(), *measures.values())
+        .where(window)
+        .group_by(func.date(tanggal), *keys.values())
+    ).all()
+
+    for row in rows:
+        pk = {'tanggal': _as_date(row[0]), **dict(zip(key_names, row[1:1 + len(key_names)]))}
+        totals = row[1 + len(key_names):]
+        current = db.session.get(rollup, pk)
+        if current is None:
+            db.session.add(rollup(**pk, **dict(zip(measure_names, totals))))
+        else:
+            for name, value in zip(measure_names, totals):
+                setattr(current, name, getattr(current, name) + value)
+    return len(rows)
+
+
+def refresh_source(name, batch_size=50000):
+    model, tanggal, rollups = SOURCES[name]
+    cutoff = db.session.scalar(select(utcnow())) - timedelta(seconds=_settle_seconds())
+    folded = 0
+    while True:
+        try:
+            mark = _watermark(name)
+            pending = model.id > mark.last_id
+            frontier = db.session.scalar(select(func.min(model.id)).where(pending, model.created_at >= cutoff))
+            if frontier is not None:
+                pending = and_(pending, model.id < frontier)
+            upper = db.session.scalar(
+                select(model.id).where(pending).order_by(model.id).offset(batch_size - 1).limit(1)
+            ) or db.session.scalar(select(func.max(model.id)).where(pending))
+            if upper is None:
+                # Marks when the rollups were last brought up to date
+                mark.updated_at = utcnow()
+                db.session.commit()
+                return folded
+
+            window = and_(model.id > mark.last_id, model.id <= upper)
+            for rollup, keys, measures in rollups:
+                _fold(rollup, tanggal, keys, measures, window)
+            folded += db.session.scalar(select(func.count(model.id)).where(window))
+            mark.last_id = upper
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def refresh_rollups(batch_size=50000):
+    return {name: refresh_source(name, batch_size) for name in SOURCES}
+
+
+def rollups_stale():
+    max_age = timedelta(seconds=_max_age_seconds())
+    refreshed, oldest = db.session.execute(
+        select(func.count(RekapWatermark.nama), func.min(RekapWatermark.updated_at))
+        .where(RekapWatermark.nama.in_(SOURCES))
+    ).one()
+    db.session.commit()
+    if refreshed < len(SOURCES):
+        return True
+    return db.session.scalar(select(utcnow())) - oldest > max_age
+
+
+def _refresh_in_background(app):
+    with app.app_context():
+        try:
+            if rollups_stale():
+                app.logger.info("Rekap diperbarui: %s", refresh_rollups())
+        except Exception:
+            app.logger.exception("Gagal memperbarui rekap")
+        finally:
+            _refresh_lock.release()
+
+
+def refresh_when_stale(view):
+    # Checks at most every ROLLUP_MAX_AGE_SECONDS / 2 per worker and never
+    # runs two refreshes at once in a worker; workers and instances that
+    # refresh together are serialized by the watermark row lock
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        now = time.monotonic()
+        if now - _state['checked_at'] >= _max_age_seconds() / 2 and _refresh_lock.acquire(blocking=False):
+            _state['checked_at'] = now
+            threading.Thread(
+                target=_refresh_in_background, args=(current_app._get_current_object(),), daemon=True
+            ).start()
+        return view(*args, **kwargs)
+    return wrapper
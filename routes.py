@@ -1,24 +1,62 @@
-from flask import render_template, send_from_directory, request, jsonify, session, redirect, url_for
-from werkzeug.security import generate_password_hash, check_password_hash
-from app import app, db
-from models import User, Pesanan, Saldo, Chat
-from datetime import datetime
+from flask import Blueprint, abort, current_app, render_template, send_file, send_from_directory, request, jsonify, session, redirect, url_for
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
+from app import db
+from models import User, Pesanan, Saldo, Chat, RekapLayanan, RekapMitra, RekapSaldo, DokumenVerifikasi
+from serializers import (
+    CHAT_LIST, MITRA_UNVERIFIED, MITRA_VERIFIED, PESANAN_BY_MITRA, PESANAN_BY_USER, PESANAN_LIST,
+    REPORT_HARIAN, REPORT_LAYANAN, REPORT_MITRA, REPORT_SALDO, REPORT_SALDO_MITRA,
+    SALDO_LIST, USER_LIST, PesananMitra, PesananUser, json_response,
+)
+from admission import admission_stats, priority
+from rollups import refresh_rollups, refresh_when_stale
+from singleflight import single_flight
+from uploads import UploadError, blob_path, receive_files, requires_storage, schedule_thumbnails, thumbnail_path
+from datetime import date, datetime
+import hmac
 import os
 
 
+bp = Blueprint('routes', __name__)
+
+
+# Health check endpoint
+@bp.route('/health')
+@priority('critical')
+def health():
+    return {'status': 'healthy', 'message': 'SmartCare server is running'}
+
+
+@bp.route('/health/admission')
+@priority('critical')
+def health_admission():
+    return jsonify(admission_stats())
+
+
 # Static file routes
-@app.route('/')
+@bp.route('/')
 def index():
     return send_from_directory('.', 'index.html')
 
 
-@app.route('/<path:filename>')
+@bp.route('/<path:filename>')
 def serve_static(filename):
+    # Uploaded documents live under instance/ (or UPLOAD_DIR) and are only
+    # served through the API; compare resolved paths so ./, %2E and ../
+    # segments cannot reach them
+    path = safe_join(current_app.root_path, filename)
+    if path is None:
+        abort(404)
+    path = os.path.realpath(path)
+    for private in (current_app.instance_path, current_app.config["UPLOAD_DIR"]):
+        private = os.path.realpath(private)
+        if path == private or path.startswith(private + os.sep):
+            abort(404)
     return send_from_directory('.', filename)
 
 
 # API Routes
-@app.route('/api/register', methods=['POST'])
+@bp.route('/api/register', methods=['POST'])
+@priority('critical')
 def api_register():
     try:
         data = request.get_json()
@@ -50,7 +88,8 @@ def api_register():
         return jsonify({'error': 'Gagal mendaftar'}), 500
 
 
-@app.route('/api/login', methods=['POST'])
+@bp.route('/api/login', methods=['POST'])
+@priority('critical')
 def api_login():
     try:
         data = request.get_json()
@@ -76,33 +115,26 @@ def api_login():
         return jsonify({'error': 'Gagal login'}), 500
 
 
-@app.route('/api/users', methods=['GET'])
+@bp.route('/api/users', methods=['GET'])
+@priority('bulk')
+@single_flight()
 def api_get_users():
     try:
-        users = User.query.all()
-        users_data = []
-        for user in users:
-            users_data.append({
-                'id': user.id,
-                'email': user.email,
-                'nama_lengkap': user.nama_lengkap,
-                'role': user.role,
-                'status_verifikasi': user.status_verifikasi,
-                'created_at': user.created_at.isoformat()
-            })
-        return jsonify({'data': users_data}), 200
+        rows = db.session.execute(USER_LIST.select()).all()
+        return json_response({'data': USER_LIST.dump_all(rows)}), 200
     except Exception as e:
         return jsonify({'error': 'Gagal mengambil data users'}), 500
 
 
-@app.route('/api/users/<int:user_id>/verify', methods=['PUT'])
+@bp.route('/api/users/<int:user_id>/verify', methods=['PUT'])
 def api_verify_user(user_id):
     try:
+        data = request.get_json(silent=True) or {}
         user = User.query.get(user_id)
         if not user:
             return jsonify({'error': 'User tidak ditemukan'}), 404
             
-        user.status_verifikasi = 'terverifikasi'
+        user.status_verifikasi = data.get('status', 'terverifikasi')
         user.updated_at = datetime.utcnow()
         db.session.commit()
         
@@ -112,38 +144,48 @@ def api_verify_user(user_id):
         return jsonify({'error': 'Gagal memverifikasi user'}), 500
 
 
-@app.route('/api/pesanan', methods=['GET'])
+@bp.route('/api/mitra/unverified', methods=['GET'])
+@priority('bulk')
+@single_flight()
+def api_get_unverified_mitra():
+    try:
+        rows = db.session.execute(
+            MITRA_UNVERIFIED.select().filter_by(role='mitra', status_verifikasi='menunggu_verifikasi')
+        ).all()
+        return json_response({'data': MITRA_UNVERIFIED.dump_all(rows)}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal mengambil data mitra'}), 500
+
+
+@bp.route('/api/mitra/verified', methods=['GET'])
+@single_flight()
+def api_get_verified_mitra():
+    try:
+        rows = db.session.execute(
+            MITRA_VERIFIED.select().filter_by(role='mitra', status_verifikasi='terverifikasi')
+        ).all()
+        return json_response({'data': MITRA_VERIFIED.dump_all(rows)}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal mengambil data mitra'}), 500
+
+
+@bp.route('/api/pesanan', methods=['GET'])
+@priority('bulk')
+@single_flight()
 def api_get_pesanan():
     try:
-        pesanan = Pesanan.query.all()
-        pesanan_data = []
-        for p in pesanan:
-            pesanan_data.append({
-                'id': p.id,
-                'id_user': p.id_user,
-                'id_mitra': p.id_mitra,
-                'jenis_layanan': p.jenis_layanan,
-                'deskripsi': p.deskripsi,
-                'alamat': p.alamat,
-                'waktu_diinginkan': p.waktu_diinginkan.isoformat(),
-                'estimasi_budget': p.estimasi_budget,
-                'status': p.status,
-                'waktu_pesan': p.waktu_pesan.isoformat(),
-                'user': {
-                    'nama_lengkap': p.user.nama_lengkap,
-                    'email': p.user.email
-                },
-                'mitra': {
-                    'nama_lengkap': p.mitra.nama_lengkap,
-                    'email': p.mitra.email
-                }
-            })
-        return jsonify({'data': pesanan_data}), 200
+        rows = db.session.execute(
+            PESANAN_LIST.select()
+            .join(PesananUser, Pesanan.id_user == PesananUser.id)
+            .join(PesananMitra, Pesanan.id_mitra == PesananMitra.id)
+        ).all()
+        return json_response({'data': PESANAN_LIST.dump_all(rows)}), 200
     except Exception as e:
         return jsonify({'error': 'Gagal mengambil data pesanan'}), 500
 
 
-@app.route('/api/pesanan', methods=['POST'])
+@bp.route('/api/pesanan', methods=['POST'])
+@priority('critical')
 def api_create_pesanan():
     try:
         data = request.get_json()
@@ -168,7 +210,37 @@ def api_create_pesanan():
         return jsonify({'error': 'Gagal membuat pesanan'}), 500
 
 
-@app.route('/api/pesanan/<int:pesanan_id>/status', methods=['PUT'])
+@bp.route('/api/pesanan/user/<int:user_id>', methods=['GET'])
+@single_flight()
+def api_get_pesanan_by_user(user_id):
+    try:
+        rows = db.session.execute(
+            PESANAN_BY_USER.select()
+            .join(PesananMitra, Pesanan.id_mitra == PesananMitra.id)
+            .where(Pesanan.id_user == user_id)
+            .order_by(Pesanan.waktu_pesan.desc())
+        ).all()
+        return json_response({'data': PESANAN_BY_USER.dump_all(rows)}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal mengambil data pesanan'}), 500
+
+
+@bp.route('/api/pesanan/mitra/<int:mitra_id>', methods=['GET'])
+@single_flight()
+def api_get_pesanan_by_mitra(mitra_id):
+    try:
+        rows = db.session.execute(
+            PESANAN_BY_MITRA.select()
+            .join(PesananUser, Pesanan.id_user == PesananUser.id)
+            .where(Pesanan.id_mitra == mitra_id)
+            .order_by(Pesanan.waktu_pesan.desc())
+        ).all()
+        return json_response({'data': PESANAN_BY_MITRA.dump_all(rows)}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal mengambil data pesanan'}), 500
+
+
+@bp.route('/api/pesanan/<int:pesanan_id>/status', methods=['PUT'])
 def api_update_pesanan_status(pesanan_id):
     try:
         data = request.get_json()
@@ -186,35 +258,22 @@ def api_update_pesanan_status(pesanan_id):
         return jsonify({'error': 'Gagal memperbarui status pesanan'}), 500
 
 
-@app.route('/api/saldo', methods=['GET'])
+@bp.route('/api/saldo', methods=['GET'])
+@single_flight()
 def api_get_saldo():
     try:
         user_id = request.args.get('user_id')
+        query = SALDO_LIST.select().join(User, Saldo.id_user == User.id)
         if user_id:
-            saldo_records = Saldo.query.filter_by(id_user=user_id).all()
-        else:
-            saldo_records = Saldo.query.all()
-            
-        saldo_data = []
-        for s in saldo_records:
-            saldo_data.append({
-                'id': s.id,
-                'id_user': s.id_user,
-                'jumlah': s.jumlah,
-                'jenis_transaksi': s.jenis_transaksi,
-                'deskripsi': s.deskripsi,
-                'created_at': s.created_at.isoformat(),
-                'user': {
-                    'nama_lengkap': s.user.nama_lengkap,
-                    'email': s.user.email
-                }
-            })
-        return jsonify({'data': saldo_data}), 200
+            query = query.where(Saldo.id_user == user_id)
+
+        rows = db.session.execute(query).all()
+        return json_response({'data': SALDO_LIST.dump_all(rows)}), 200
     except Exception as e:
         return jsonify({'error': 'Gagal mengambil data saldo'}), 500
 
 
-@app.route('/api/saldo', methods=['POST'])
+@bp.route('/api/saldo', methods=['POST'])
 def api_add_saldo():
     try:
         data = request.get_json()
@@ -236,34 +295,22 @@ def api_add_saldo():
         return jsonify({'error': 'Gagal menambahkan saldo'}), 500
 
 
-@app.route('/api/chat', methods=['GET'])
+@bp.route('/api/chat', methods=['GET'])
+@single_flight()
 def api_get_chat():
     try:
         pesanan_id = request.args.get('pesanan_id')
+        query = CHAT_LIST.select().join(User, Chat.id_pengirim == User.id)
         if pesanan_id:
-            chat_messages = Chat.query.filter_by(id_pesanan=pesanan_id).order_by(Chat.created_at).all()
-        else:
-            chat_messages = Chat.query.order_by(Chat.created_at).all()
-            
-        chat_data = []
-        for c in chat_messages:
-            chat_data.append({
-                'id': c.id,
-                'id_pesanan': c.id_pesanan,
-                'id_pengirim': c.id_pengirim,
-                'pesan': c.pesan,
-                'created_at': c.created_at.isoformat(),
-                'pengirim': {
-                    'nama_lengkap': c.pengirim.nama_lengkap,
-                    'email': c.pengirim.email
-                }
-            })
-        return jsonify({'data': chat_data}), 200
+            query = query.where(Chat.id_pesanan == pesanan_id)
+
+        rows = db.session.execute(query.order_by(Chat.created_at)).all()
+        return json_response({'data': CHAT_LIST.dump_all(rows)}), 200
     except Exception as e:
         return jsonify({'error': 'Gagal mengambil data chat'}), 500
 
 
-@app.route('/api/chat', methods=['POST'])
+@bp.route('/api/chat', methods=['POST'])
 def api_send_chat():
     try:
         data = request.get_json()
@@ -284,8 +331,230 @@ def api_send_chat():
         return jsonify({'error': 'Gagal mengirim pesan'}), 500
 
 
+# Verification document routes, see uploads.py
+def _dokumen_data(d):
+    return {
+        'id': d.id,
+        'id_user': d.id_user,
+        'sha256': d.sha256,
+        'nama_file': d.nama_file,
+        'content_type': d.content_type,
+        'ukuran': d.ukuran,
+        'created_at': d.created_at.isoformat()
+    }
+
+
+@bp.route('/api/users/<int:user_id>/dokumen', methods=['POST'])
+@priority('normal', max_concurrent=4)
+@requires_storage
+def api_upload_dokumen(user_id):
+    try:
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({'error': 'User tidak ditemukan'}), 404
+        # Give the connection back to the pool while the body streams in
+        db.session.rollback()
+
+        try:
+            files = receive_files()
+        except UploadError as e:
+            return jsonify({'error': str(e)}), 400
+
+        dokumen = [DokumenVerifikasi(id_user=user_id, **f) for f in files]
+        db.session.add_all(dokumen)
+        db.session.commit()
+
+        schedule_thumbnails(files)
+        return jsonify({'message': 'Dokumen berhasil diunggah', 'data': [_dokumen_data(d) for d in dokumen]}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Gagal mengunggah dokumen'}), 500
+
+
+@bp.route('/api/users/<int:user_id>/dokumen', methods=['GET'])
+@requires_storage
+def api_get_dokumen(user_id):
+    try:
+        dokumen = DokumenVerifikasi.query.filter_by(id_user=user_id).order_by(DokumenVerifikasi.created_at).all()
+        return jsonify({'data': [_dokumen_data(d) for d in dokumen]}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal mengambil data dokumen'}), 500
+
+
+@bp.route('/api/dokumen/<int:dokumen_id>', methods=['GET'])
+@requires_storage
+def api_download_dokumen(dokumen_id):
+    dokumen = db.session.get(DokumenVerifikasi, dokumen_id)
+    if not dokumen:
+        return jsonify({'error': 'Dokumen tidak ditemukan'}), 404
+
+    path = blob_path(dokumen.sha256)
+    if not os.path.exists(path):
+        current_app.logger.error("File dokumen %s hilang dari %s", dokumen_id, path)
+        return jsonify({'error': 'File dokumen tidak ditemukan'}), 404
+    # conditional=True answers Range and If-None-Match requests
+    return send_file(
+        path,
+        mimetype=dokumen.content_type,
+        download_name=dokumen.nama_file,
+        etag=dokumen.sha256,
+        conditional=True,
+        max_age=31536000,
+    )
+
+
+@bp.route('/api/dokumen/<int:dokumen_id>/thumbnail', methods=['GET'])
+@requires_storage
+def api_dokumen_thumbnail(dokumen_id):
+    dokumen = db.session.get(DokumenVerifikasi, dokumen_id)
+    if not dokumen:
+        return jsonify({'error': 'Dokumen tidak ditemukan'}), 404
+
+    path = thumbnail_path(dokumen.sha256)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Pratinjau belum tersedia'}), 404
+    return send_file(path, mimetype='image/jpeg', etag=dokumen.sha256 + '-thumb', conditional=True, max_age=31536000)
+
+
+# Report routes, read from the rollup tables only (see rollups.py)
+def _report_range(column):
+    # Optional ?dari=YYYY-MM-DD&sampai=YYYY-MM-DD, both inclusive
+    filters = []
+    if request.args.get('dari'):
+        filters.append(column >= date.fromisoformat(request.args['dari']))
+    if request.args.get('sampai'):
+        filters.append(column <= date.fromisoformat(request.args['sampai']))
+    return filters
+
+
+@bp.route('/api/reports/layanan', methods=['GET'])
+@priority('bulk')
+@refresh_when_stale
+@single_flight()
+def api_report_layanan():
+    try:
+        filters = _report_range(RekapLayanan.tanggal)
+    except ValueError:
+        return jsonify({'error': 'Format tanggal tidak valid'}), 400
+    try:
+        rows = db.session.execute(
+            REPORT_LAYANAN.select().where(*filters).group_by(RekapLayanan.jenis_layanan)
+        ).all()
+        return json_response({'data': REPORT_LAYANAN.dump_all(rows)}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal mengambil laporan layanan'}), 500
+
+
+@bp.route('/api/reports/harian', methods=['GET'])
+@priority('bulk')
+@refresh_when_stale
+@single_flight()
+def api_report_harian():
+    try:
+        filters = _report_range(RekapLayanan.tanggal)
+    except ValueError:
+        return jsonify({'error': 'Format tanggal tidak valid'}), 400
+    try:
+        rows = db.session.execute(
+            REPORT_HARIAN.select().where(*filters)
+            .group_by(RekapLayanan.tanggal)
+            .order_by(RekapLayanan.tanggal)
+        ).all()
+        return json_response({'data': REPORT_HARIAN.dump_all(rows)}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal mengambil laporan harian'}), 500
+
+
+@bp.route('/api/reports/mitra', methods=['GET'])
+@priority('bulk')
+@refresh_when_stale
+@single_flight()
+def api_report_mitra():
+    try:
+        filters = _report_range(RekapMitra.tanggal)
+        saldo_filters = _report_range(RekapSaldo.tanggal)
+    except ValueError:
+        return jsonify({'error': 'Format tanggal tidak valid'}), 400
+    try:
+        rows = db.session.execute(
+            REPORT_MITRA.select()
+            .join(User, RekapMitra.id_mitra == User.id)
+            .where(*filters)
+            .group_by(RekapMitra.id_mitra, User.nama_lengkap)
+        ).all()
+        mitra_data = REPORT_MITRA.dump_all(rows)
+
+        saldo_rows = db.session.execute(
+            REPORT_SALDO_MITRA.select()
+            .join(User, RekapSaldo.id_user == User.id)
+            .where(User.role == 'mitra', *saldo_filters)
+            .group_by(RekapSaldo.id_user, RekapSaldo.jenis_transaksi)
+        ).all()
+        saldo = {}
+        for s in REPORT_SALDO_MITRA.dump_all(saldo_rows):
+            saldo.setdefault(s.pop('id_mitra'), {})[s.pop('jenis_transaksi')] = s
+        for m in mitra_data:
+            m['saldo'] = saldo.get(m['id_mitra'], {})
+
+        return json_response({'data': mitra_data}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal mengambil laporan mitra'}), 500
+
+
+@bp.route('/api/reports/saldo', methods=['GET'])
+@priority('bulk')
+@refresh_when_stale
+@single_flight()
+def api_report_saldo():
+    try:
+        filters = _report_range(RekapSaldo.tanggal)
+    except ValueError:
+        return jsonify({'error': 'Format tanggal tidak valid'}), 400
+    try:
+        rows = db.session.execute(
+            REPORT_SALDO.select().where(*filters)
+            .group_by(RekapSaldo.tanggal, RekapSaldo.jenis_transaksi)
+            .order_by(RekapSaldo.tanggal)
+        ).all()
+        return json_response({'data': REPORT_SALDO.dump_all(rows)}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal mengambil laporan saldo'}), 500
+
+
+@bp.route('/api/reports/refresh', methods=['POST'])
+@priority('bulk')
+def api_refresh_reports():
+    # Reads refresh stale rollups on their own; this is for operators holding
+    # ROLLUP_REFRESH_TOKEN
+    token = os.environ.get("ROLLUP_REFRESH_TOKEN")
+    if not token or not hmac.compare_digest(request.headers.get('X-Refresh-Token', ''), token):
+        return jsonify({'error': 'Tidak diizinkan'}), 403
+    try:
+        return jsonify({'message': 'Laporan berhasil diperbarui', 'data': refresh_rollups()}), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal memperbarui laporan'}), 500
+
+
+# Several API calls in one round trip, see batch.py
+@bp.route('/api/batch', methods=['POST'])
+def api_batch():
+    from batch import BatchError, parse_batch, run_batch
+
+    try:
+        data = request.get_json(silent=True)
+        subrequests = parse_batch(data)
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        body = run_batch(subrequests, parallel=bool(data.get('parallel')))
+        return current_app.response_class(body, mimetype='application/json'), 200
+    except Exception as e:
+        return jsonify({'error': 'Gagal memproses batch'}), 500
+
+
 # Admin special login route
-@app.route('/api/admin/login', methods=['POST'])
+@bp.route('/api/admin/login', methods=['POST'])
+@priority('critical')
 def api_admin_login():
     try:
         data = request.get_json()
@@ -217,12 +217,17 @@ async function checkAuthStatus() {
 
 // Admin Dashboard Functions
 async function initAdminDashboard() {
-    await loadAdminStats();
-    await loadVerificationRequests();
-    await loadPendingTopups();
-    await loadAllPesanan();
-    await loadAllUsers();
-    await loadUsersList();
+    // One round trip for everything the loaders below need
+    await DatabaseService.prefetch(['/users', '/mitra/unverified', '/pesanan']);
+    await Promise.all([
+        loadAdminStats(),
+        loadVerificationRequests(),
+        loadPendingTopups(),
+        loadAllPesanan(),
+        loadAllUsers(),
+        loadUsersList()
+    ]);
+    DatabaseService.clearPrefetch();
 }
 
 async function loadAdminStats() {
@@ -501,10 +506,14 @@ async function initUserDashboard(user) {
     document.getElementById('namaLengkap').value = user.nama_lengkap;
     document.getElementById('email').value = user.email;
     
-    await loadUserStats(user.id);
-    await loadUserPesanan(user.id);
-    await loadUserSaldo(user.id);
-    await loadVerifiedMitra();
+    await DatabaseService.prefetch([`/pesanan/user/${user.id}`, '/mitra/verified']);
+    await Promise.all([
+        loadUserStats(user.id),
+        loadUserPesanan(user.id),
+        loadUserSaldo(user.id),
+        loadVerifiedMitra()
+    ]);
+    DatabaseService.clearPrefetch();
     
     // Setup real-time subscriptions
     setupUserSubscriptions(user.id);
@@ -779,9 +788,13 @@ async function initMitraDashboard(user) {
     document.getElementById('email').value = user.email;
     document.getElementById('statusVerifikasi').value = user.status_verifikasi;
     
-    await loadMitraStats(user.id);
-    await loadMitraPesanan(user.id);
-    await loadMitraSaldo(user.id);
+    await DatabaseService.prefetch([`/pesanan/mitra/${user.id}`]);
+    await Promise.all([
+        loadMitraStats(user.id),
+        loadMitraPesanan(user.id),
+        loadMitraSaldo(user.id)
+    ]);
+    DatabaseService.clearPrefetch();
     
     // Update verification status display
     updateVerificationStatus(user.status_verifikasi);
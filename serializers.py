@@ -0,0 +1,186 @@
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import BigInteger, cast, func, select
+from sqlalchemy.orm import aliased
+
+from models import User, Pesanan, Saldo, Chat, RekapLayanan, RekapMitra, RekapSaldo
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+    import json
+
+
+# Columnar serialization for list endpoints.
+#
+# Instead of loading ORM objects and building dicts attribute by attribute,
+# each endpoint selects just the columns it returns as plain row tuples and
+# turns them into dicts with a function generated once at import time.
+# Datetimes are left to the JSON encoder (orjson writes them natively).
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(payload):
+        return orjson.dumps(payload, default=_default)
+else:
+    def dumps(payload):
+        return json.dumps(payload, default=_default, separators=(',', ':'))
+
+
+def json_response(payload):
+    return current_app.response_class(dumps(payload), mimetype='application/json')
+
+
+class RowSerializer:
+    def __init__(self, fields):
+        self.columns = []
+        source = self._build(fields)
+        self.dump = eval(f"lambda row: {source}", {})
+
+    def _build(self, fields):
+        items = []
+        for key, field in fields.items():
+            if isinstance(field, dict):
+                items.append(f"{key!r}: {self._build(field)}")
+            else:
+                items.append(f"{key!r}: row[{len(self.columns)}]")
+                self.columns.append(field)
+        return "{" + ", ".join(items) + "}"
+
+    def select(self):
+        return select(*self.columns)
+
+    def dump_all(self, rows):
+        dump = self.dump
+        return [dump(row) for row in rows]
+
+
+PesananUser = aliased(User, name='pesanan_user')
+PesananMitra = aliased(User, name='pesanan_mitra')
+
+USER_LIST = RowSerializer({
+    'id': User.id,
+    'email': User.email,
+    'nama_lengkap': User.nama_lengkap,
+    'role': User.role,
+    'status_verifikasi': User.status_verifikasi,
+    'created_at': User.created_at,
+})
+
+MITRA_UNVERIFIED = RowSerializer({
+    'id': User.id,
+    'email': User.email,
+    'nama_lengkap': User.nama_lengkap,
+    'created_at': User.created_at,
+})
+
+MITRA_VERIFIED = RowSerializer({
+    'id': User.id,
+    'email': User.email,
+    'nama_lengkap': User.nama_lengkap,
+})
+
+_PESANAN_FIELDS = {
+    'id': Pesanan.id,
+    'jenis_layanan': Pesanan.jenis_layanan,
+    'deskripsi': Pesanan.deskripsi,
+    'alamat': Pesanan.alamat,
+    'waktu_diinginkan': Pesanan.waktu_diinginkan,
+    'estimasi_budget': Pesanan.estimasi_budget,
+    'status': Pesanan.status,
+    'waktu_pesan': Pesanan.waktu_pesan,
+}
+_PESANAN_USER = {
+    'nama_lengkap': PesananUser.nama_lengkap,
+    'email': PesananUser.email,
+}
+_PESANAN_MITRA = {
+    'nama_lengkap': PesananMitra.nama_lengkap,
+    'email': PesananMitra.email,
+}
+
+PESANAN_LIST = RowSerializer({
+    'id': Pesanan.id,
+    'id_user': Pesanan.id_user,
+    'id_mitra': Pesanan.id_mitra,
+    **_PESANAN_FIELDS,
+    'user': _PESANAN_USER,
+    'mitra': _PESANAN_MITRA,
+})
+
+PESANAN_BY_USER = RowSerializer({**_PESANAN_FIELDS, 'mitra': _PESANAN_MITRA})
+
+PESANAN_BY_MITRA = RowSerializer({**_PESANAN_FIELDS, 'user': _PESANAN_USER})
+
+SALDO_LIST = RowSerializer({
+    'id': Saldo.id,
+    'id_user': Saldo.id_user,
+    'jumlah': Saldo.jumlah,
+    'jenis_transaksi': Saldo.jenis_transaksi,
+    'deskripsi': Saldo.deskripsi,
+    'created_at': Saldo.created_at,
+    'user': {
+        'nama_lengkap': User.nama_lengkap,
+        'email': User.email,
+    },
+})
+
+CHAT_LIST = RowSerializer({
+    'id': Chat.id,
+    'id_pesanan': Chat.id_pesanan,
+    'id_pengirim': Chat.id_pengirim,
+    'pesan': Chat.pesan,
+    'created_at': Chat.created_at,
+    'pengirim': {
+        'nama_lengkap': User.nama_lengkap,
+        'email': User.email,
+    },
+})
+
+
+
+def _total(column):
+    # SUM over BIGINT is NUMERIC on PostgreSQL; keep it an int for JSON
+    return cast(func.coalesce(func.sum(column), 0), BigInteger)
+
+
+REPORT_LAYANAN = RowSerializer({
+    'jenis_layanan': RekapLayanan.jenis_layanan,
+    'jumlah_pesanan': _total(RekapLayanan.jumlah_pesanan),
+    'total_budget': _total(RekapLayanan.total_budget),
+})
+
+REPORT_HARIAN = RowSerializer({
+    'tanggal': RekapLayanan.tanggal,
+    'jumlah_pesanan': _total(RekapLayanan.jumlah_pesanan),
+    'total_budget': _total(RekapLayanan.total_budget),
+})
+
+REPORT_MITRA = RowSerializer({
+    'id_mitra': RekapMitra.id_mitra,
+    'nama_lengkap': User.nama_lengkap,
+    'jumlah_pesanan': _total(RekapMitra.jumlah_pesanan),
+    'total_budget': _total(RekapMitra.total_budget),
+})
+
+REPORT_SALDO = RowSerializer({
+    'tanggal': RekapSaldo.tanggal,
+    'jenis_transaksi': RekapSaldo.jenis_transaksi,
+    'jumlah_transaksi': _total(RekapSaldo.jumlah_transaksi),
+    'total_jumlah': _total(RekapSaldo.total_jumlah),
+})
+
+REPORT_SALDO_MITRA = RowSerializer({
+    'id_mitra': RekapSaldo.id_user,
+    'jenis_transaksi': RekapSaldo.jenis_transaksi,
+    'jumlah_transaksi': _total(RekapSaldo.jumlah_transaksi),
+    'total_jumlah': _total(RekapSaldo.total_jumlah),
+})
@@ -0,0 +1,137 @@
+import os
+import uuid
+
+from sqlalchemy import String, cast, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import Pesanan, Saldo, Pencairan, utcnow
+
+
+# Batch settlement of completed pesanan.
+#
+# Each batch claims the next completed, unsettled pesanan in id order by
+# inserting their pencairan rows, then writes the user debit, mitra credit
+# and (optionally) platform fee ledger rows with INSERT ... SELECT from those
+# pencairan rows, all in one transaction. The pencairan primary key makes a
+# pesanan settle at most once, so runs can be repeated or resumed at will.
+# A pesanan without an estimasi_budget is left unsettled and reported, so it
+# can be settled once the amount is filled in.
+
+def _fee_percent():
+    return int(os.environ.get("SETTLEMENT_FEE_PERCENT", 10))
+
+
+def _platform_user_id():
+    value = os.environ.get("SETTLEMENT_PLATFORM_USER_ID")
+    return int(value) if value else None
+
+
+def _unsettled(after):
+    return (
+        select(Pesanan.id)
+        .outerjoin(Pencairan, Pencairan.id_pesanan == Pesanan.id)
+        .where(Pesanan.status == 'selesai', Pencairan.id_pesanan.is_(None), Pesanan.id > after,
+               Pesanan.estimasi_budget.isnot(None))
+    )
+
+
+def _without_budget():
+    return db.session.scalar(
+        select(func.count(Pesanan.id))
+        .outerjoin(Pencairan, Pencairan.id_pesanan == Pesanan.id)
+        .where(Pesanan.status == 'selesai', Pencairan.id_pesanan.is_(None), Pesanan.estimasi_budget.is_(None))
+    )
+
+
+def _ledger(run_id, after, upper, id_user, jumlah, jenis_transaksi, deskripsi, now, *where):
+    return insert(Saldo).from_select(
+        ['id_user', 'jumlah', 'jenis_transaksi', 'deskripsi', 'created_at'],
+        select(
+            id_user,
+            jumlah,
+            literal(jenis_transaksi, String),
+            literal(deskripsi, String) + cast(Pencairan.id_pesanan, String),
+            now,
+        ).where(
+            Pencairan.id_run == run_id,
+            Pencairan.id_pesanan > after,
+            Pencairan.id_pesanan <= upper,
+            *where,
+        ),
+    )
+
+
+def settle_batch(run_id, after, batch_size, fee_percent, platform_user_id):
+    window = _unsettled(after).order_by(Pesanan.id).limit(batch_size).subquery()
+    upper = db.session.scalar(select(func.max(window.c.id)))
+    if upper is None:
+        return None, 0
+
+    # Ledger rows are folded into rollups by created_at, see models.utcnow
+    now = utcnow()
+    budget = Pesanan.estimasi_budget
+    claimed = db.session.execute(insert(Pencairan).from_select(
+        ['id_pesanan', 'id_run', 'id_user', 'id_mitra', 'jumlah', 'biaya_platform', 'created_at'],
+        select(
+            Pesanan.id,
+            literal(run_id, String),
+            Pesanan.id_user,
+            Pesanan.id_mitra,
+            budget,
+            budget * fee_percent // 100,
+            now,
+        ).where(Pesanan.id.in_(_unsettled(after).where(Pesanan.id <= upper))),
+    )).rowcount
+
+    db.session.execute(_ledger(
+        run_id, after, upper, Pencairan.id_user, -Pencairan.jumlah,
+        'pembayaran', 'Pembayaran pesanan #', now, Pencairan.jumlah > 0,
+    ))
+    db.session.execute(_ledger(
+        run_id, after, upper, Pencairan.id_mitra, Pencairan.jumlah - Pencairan.biaya_platform,
+        'pendapatan', 'Pendapatan pesanan #', now, Pencairan.jumlah > 0,
+    ))
+    if platform_user_id is not None:
+        db.session.execute(_ledger(
+            run_id, after, upper, literal(platform_user_id), Pencairan.biaya_platform,
+            'biaya_platform', 'Biaya platform pesanan #', now, Pencairan.biaya_platform > 0,
+        ))
+    return upper, claimed
+
+
+def run_settlement(batch_size=5000):
+    run_id = str(uuid.uuid4())
+    fee_percent = _fee_percent()
+    platform_user_id = _platform_user_id()
+    after = 0
+    settled = 0
+    conflicts = 0
+    while True:
+        try:
+            upper, claimed = settle_batch(run_id, after, batch_size, fee_percent, platform_user_id)
+            db.session.commit()
+        except IntegrityError:
+            # Another run claimed part of this batch first; retry without it
+            db.session.rollback()
+            conflicts += 1
+            if conflicts > 3:
+                raise
+            continue
+        except Exception:
+            db.session.rollback()
+            raise
+        if upper is None:
+            break
+        after = upper
+        settled += claimed
+        conflicts = 0
+
+    totals = db.session.execute(
+        select(func.coalesce(func.sum(Pencairan.jumlah), 0), func.coalesce(func.sum(Pencairan.biaya_platform), 0))
+        .where(Pencairan.id_run == run_id)
+    ).one()
+    without_budget = _without_budget()
+    db.session.commit()
+    return {'id_run': run_id, 'pesanan': settled, 'jumlah': int(totals[0]), 'biaya_platform': int(totals[1]),
+            'tanpa_budget': without_budget}
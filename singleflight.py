@@ -0,0 +1,170 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, request
+
+from replica import is_pinned
+
+
+# Request coalescing ("single flight") for read endpoints.
+#
+# Identical concurrent GETs share one execution of the view: the first
+# request runs it and the others wait for and reuse its response. Within a
+# worker this uses an in-memory table of in-flight keys, so it needs
+# threaded workers. With SINGLE_FLIGHT_DIR set, workers also coalesce with
+# each other via a file lock per key; a waiter reuses the stored response
+# only if it was written after the waiter arrived.
+#
+# Either way a waiter may get the result of a query that started shortly
+# before it arrived. That is no staler than the replica these reads may be
+# served from anyway, but a client pinned to the primary after a write must
+# see that write, so pinned requests are never coalesced.
+#
+# Stored responses hold user data and are only useful to the requests
+# queued behind them, so each worker sweeps files older than
+# SINGLE_FLIGHT_TTL from the directory.
+
+_flights_lock = threading.Lock()
+_flights = {}
+_swept_at = 0.0
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def default_key():
+    return request.full_path
+
+
+def _local_flight(key, compute):
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = compute()
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+    return flight.result
+
+
+def _open_lock(path):
+    while True:
+        lock = open(path, 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # The sweep may have removed the file while we waited for it
+            if os.fstat(lock.fileno()).st_ino == os.stat(path).st_ino:
+                return lock
+        except FileNotFoundError:
+            pass
+        lock.close()
+
+
+def _sweep(directory, ttl):
+    cutoff = time.time() - ttl
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                continue
+            if not entry.name.endswith('.lock'):
+                os.unlink(entry.path)
+                continue
+            with open(entry.path, 'a') as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _maybe_sweep(directory, ttl):
+    global _swept_at
+    with _flights_lock:
+        if time.monotonic() - _swept_at < ttl:
+            return
+        _swept_at = time.monotonic()
+    _sweep(directory, ttl)
+
+
+def _shared_flight(directory, key, compute):
+    name = hashlib.sha1(key.encode()).hexdigest()
+    result_path = os.path.join(directory, name + '.resp')
+    arrived = time.time()
+
+    with _open_lock(os.path.join(directory, name + '.lock')) as lock:
+        try:
+            try:
+                if os.stat(result_path).st_mtime >= arrived:
+                    with open(result_path, 'rb') as f:
+                        status, mimetype, body = f.read().split(b'\n', 2)
+                    return body, int(status), mimetype.decode()
+            except (FileNotFoundError, ValueError):
+                pass
+
+            result = compute()
+            body, status, mimetype = result
+            fd, tmp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(b'%d\n%s\n' % (status, mimetype.encode()) + body)
+            os.replace(tmp_path, result_path)
+            return result
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def single_flight(key=default_key):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config["SINGLE_FLIGHT"] or is_pinned():
+                return view(*args, **kwargs)
+
+            def compute():
+                response = current_app.make_response(view(*args, **kwargs))
+                return response.get_data(), response.status_code, response.mimetype
+
+            flight_key = f"{request.endpoint}|{key()}"
+            directory = current_app.config["SINGLE_FLIGHT_DIR"]
+            if directory:
+                run = lambda: _shared_flight(directory, flight_key, compute)
+            else:
+                run = compute
+            body, status, mimetype = _local_flight(flight_key, run)
+            if directory:
+                _maybe_sweep(directory, current_app.config["SINGLE_FLIGHT_TTL"])
+            return current_app.response_class(body, status=status, mimetype=mimetype)
+        return wrapper
+    return decorator
+
+
+def configure_single_flight(app):
+    app.config.setdefault("SINGLE_FLIGHT", os.environ.get("SINGLE_FLIGHT", "1") != "0")
+    directory = app.config.setdefault("SINGLE_FLIGHT_DIR", os.environ.get("SINGLE_FLIGHT_DIR"))
+    app.config.setdefault("SINGLE_FLIGHT_TTL", float(os.environ.get("SINGLE_FLIGHT_TTL", 60)))
+    if directory:
+        os.makedirs(directory, exist_ok=True)
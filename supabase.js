@@ -3,6 +3,50 @@ const API_BASE = window.location.origin + '/api';
 
 // Database service that connects to our Flask backend
 class DatabaseService {
+    // Responses fetched ahead of time through /api/batch, keyed by path
+    static prefetched = new Map();
+
+    // Fetch several GET endpoints in one round trip; later calls for the
+    // same paths are answered from the batch until clearPrefetch()
+    static async prefetch(paths) {
+        try {
+            const response = await fetch(`${API_BASE}/batch`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    requests: paths.map(path => ({ method: 'GET', path: `/api${path}` })),
+                    parallel: true
+                })
+            });
+            
+            if (!response.ok) {
+                return;
+            }
+            
+            const result = await response.json();
+            result.responses.forEach((res, i) => this.prefetched.set(paths[i], res));
+        } catch (error) {
+            console.error('Error prefetching:', error);
+        }
+    }
+
+    static clearPrefetch() {
+        this.prefetched.clear();
+    }
+
+    static async get(path) {
+        const cached = this.prefetched.get(path);
+        // A shed sub-request (503 + Retry-After) is fetched again directly
+        if (cached && cached.status !== 503) {
+            return { ok: cached.status < 400, result: cached.body };
+        }
+        
+        const response = await fetch(`${API_BASE}${path}`);
+        return { ok: response.ok, result: await response.json() };
+    }
+
     // Users table operations
     static async createUser(userData) {
         try {
@@ -97,10 +141,9 @@ class DatabaseService {
 
     static async getAllUsers() {
         try {
-            const response = await fetch(`${API_BASE}/users`);
-            const result = await response.json();
+            const { ok, result } = await this.get('/users');
             
-            if (!response.ok) {
+            if (!ok) {
                 return { data: null, error: result.error };
             }
             
@@ -113,10 +156,9 @@ class DatabaseService {
 
     static async getUnverifiedMitra() {
         try {
-            const response = await fetch(`${API_BASE}/mitra/unverified`);
-            const result = await response.json();
+            const { ok, result } = await this.get('/mitra/unverified');
             
-            if (!response.ok) {
+            if (!ok) {
                 return { data: null, error: result.error };
             }
             
@@ -129,10 +171,9 @@ class DatabaseService {
 
     static async getVerifiedMitra() {
         try {
-            const response = await fetch(`${API_BASE}/mitra/verified`);
-            const result = await response.json();
+            const { ok, result } = await this.get('/mitra/verified');
             
-            if (!response.ok) {
+            if (!ok) {
                 return { data: null, error: result.error };
             }
             
@@ -169,10 +210,9 @@ class DatabaseService {
 
     static async getPesananByUser(userId) {
         try {
-            const response = await fetch(`${API_BASE}/pesanan/user/${userId}`);
-            const result = await response.json();
+            const { ok, result } = await this.get(`/pesanan/user/${userId}`);
             
-            if (!response.ok) {
+            if (!ok) {
                 return { data: null, error: result.error };
             }
             
@@ -185,10 +225,9 @@ class DatabaseService {
 
     static async getPesananByMitra(mitraId) {
         try {
-            const response = await fetch(`${API_BASE}/pesanan/mitra/${mitraId}`);
-            const result = await response.json();
+            const { ok, result } = await this.get(`/pesanan/mitra/${mitraId}`);
             
-            if (!response.ok) {
+            if (!ok) {
                 return { data: null, error: result.error };
             }
             
@@ -201,19 +240,13 @@ class DatabaseService {
 
     static async getAllPesanan() {
         try {
-            const { data: users } = await this.getAllUsers();
-            if (!users) return { data: [], error: null };
+            const { ok, result } = await this.get('/pesanan');
             
-            // Get pesanan for all users and mitra
-            const allPesanan = [];
-            for (const user of users) {
-                if (user.role === 'user') {
-                    const { data: userPesanan } = await this.getPesananByUser(user.id);
-                    if (userPesanan) allPesanan.push(...userPesanan);
-                }
+            if (!ok) {
+                return { data: null, error: result.error };
             }
             
-            return { data: allPesanan, error: null };
+            return { data: result.data, error: null };
         } catch (error) {
             console.error('Error getting all pesanan:', error);
             return { data: null, error: error.message };
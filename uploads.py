@@ -0,0 +1,258 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
+from werkzeug.utils import secure_filename
+
+
+# Streaming uploads for mitra verification documents.
+#
+# The multipart body is decoded straight from the request stream in small
+# chunks; each file part is hashed while it is written to a temporary file
+# and then moved to a content-addressed path (<dir>/<aa>/<bb>/<sha256>), so
+# identical documents are stored once and no worker ever holds a whole file
+# in memory. JPEG and PNG thumbnails are made with Pillow in a separate
+# process pool after the response is sent; PDFs get no preview. The pool is
+# only imported once the first thumbnail is scheduled.
+
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (320, 320)
+
+# Allowed types and the leading bytes their files must start with
+ALLOWED_TYPES = {
+    'image/jpeg': (b'\xff\xd8\xff',),
+    'image/png': (b'\x89PNG\r\n\x1a\n',),
+    'application/pdf': (b'%PDF-',),
+}
+
+logger = logging.getLogger(__name__)
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+
+
+class UploadError(ValueError):
+    pass
+
+
+def upload_dir():
+    return current_app.config["UPLOAD_DIR"]
+
+
+def blob_path(sha256):
+    return os.path.join(upload_dir(), sha256[:2], sha256[2:4], sha256)
+
+
+def thumbnail_path(sha256):
+    return blob_path(sha256) + '.thumb.jpg'
+
+
+def _store(part, chunks, max_bytes):
+    content_type = part.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type not in ALLOWED_TYPES:
+        raise UploadError(f'Tipe file tidak didukung: {content_type or "tidak diketahui"}')
+
+    tmp_dir = os.path.join(upload_dir(), 'tmp')
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for data in chunks:
+                size += len(data)
+                if size > max_bytes:
+                    raise UploadError(f'Ukuran file melebihi {max_bytes // (1024 * 1024)} MB')
+                if len(head) < 16:
+                    head += data[:16]
+                digest.update(data)
+                f.write(data)
+
+        if not head.startswith(ALLOWED_TYPES[content_type]):
+            raise UploadError('Isi file tidak sesuai dengan tipenya')
+        sha256 = digest.hexdigest()
+        target = blob_path(sha256)
+        if os.path.exists(target):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return {
+        'sha256': sha256,
+        'nama_file': secure_filename(part.filename or '') or sha256,
+        'content_type': content_type,
+        'ukuran': size,
+    }
+
+
+def _events(stream, decoder):
+    while True:
+        event = decoder.next_event()
+        if isinstance(event, NeedData):
+            chunk = stream.read(CHUNK_SIZE)
+            decoder.receive_data(chunk or None)
+            if not chunk:
+                # Drain what the decoder still holds after end of input
+                event = decoder.next_event()
+                while not isinstance(event, (NeedData, Epilogue)):
+                    yield event
+                    event = decoder.next_event()
+                return
+        elif isinstance(event, Epilogue):
+            return
+        else:
+            yield event
+
+
+def receive_files(field='dokumen'):
+    if request.mimetype != 'multipart/form-data' or 'boundary' not in request.mimetype_params:
+        raise UploadError('Gunakan multipart/form-data')
+
+    config = current_app.config
+    decoder = MultipartDecoder(
+        request.mimetype_params['boundary'].encode(),
+        # Bounds the decoder's buffer (and plain form fields), not the files
+        max_form_memory_size=500 * 1024,
+        max_parts=config["UPLOAD_MAX_FILES"] * 2,
+    )
+    events = _events(request.stream, decoder)
+    stored = []
+
+    for event in events:
+        if not isinstance(event, File):
+            continue
+
+        def chunks():
+            # Data events for this part until the last one
+            for data in events:
+                if not isinstance(data, Data):
+                    raise UploadError('Format multipart tidak valid')
+                if data.data:
+                    yield data.data
+                if not data.more_data:
+                    return
+            raise UploadError('Upload terputus')
+
+        if event.name != field:
+            for _ in chunks():
+                pass
+            continue
+        if len(stored) >= config["UPLOAD_MAX_FILES"]:
+            raise UploadError(f'Maksimal {config["UPLOAD_MAX_FILES"]} file per upload')
+        stored.append(_store(event, chunks(), config["UPLOAD_MAX_BYTES"]))
+
+    if not stored:
+        raise UploadError(f'Tidak ada file pada field {field}')
+    return stored
+
+
+def make_thumbnail(source, target):
+    # Runs in the thumbnail process pool
+    if os.path.exists(target):
+        return True
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+
+    with Image.open(source) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+        with os.fdopen(fd, 'wb') as f:
+            image.convert('RGB').save(f, 'JPEG', quality=80)
+    os.replace(tmp_path, target)
+    return True
+
+
+def _thumbnail_pool():
+    global _pool, _pool_pid
+    # A pool inherited from the gunicorn master is unusable after fork
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                _pool = ProcessPoolExecutor(
+                    max_workers=current_app.config["THUMBNAIL_WORKERS"],
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    # A worker that died (e.g. OOM-killed on a huge image) breaks the whole
+    # pool; drop it so the next upload starts a fresh one
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def schedule_thumbnails(documents):
+    # Only the preview is at stake here: never let it fail an upload
+    for doc in documents:
+        if not doc['content_type'].startswith('image/') or os.path.exists(thumbnail_path(doc['sha256'])):
+            continue
+        for _ in range(2):
+            pool = None
+            try:
+                pool = _thumbnail_pool()
+                future = pool.submit(make_thumbnail, blob_path(doc['sha256']), thumbnail_path(doc['sha256']))
+            except Exception as e:
+                logger.warning("Gagal menjadwalkan thumbnail: %s", e)
+                if pool is not None:
+                    _discard_pool(pool)
+                continue
+            future.add_done_callback(lambda f, pool=pool: _log_thumbnail_error(f, pool))
+            break
+
+
+def _log_thumbnail_error(future, pool):
+    from concurrent.futures.process import BrokenProcessPool
+
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.warning("Gagal membuat thumbnail: %s", error)
+        if isinstance(error, BrokenProcessPool):
+            _discard_pool(pool)
+
+
+def requires_storage(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config["UPLOADS_ENABLED"]:
+            return jsonify({'error': 'Penyimpanan dokumen belum dikonfigurasi'}), 503
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def configure_uploads(app):
+    if "UPLOADS_ENABLED" not in app.config:
+        # A deployment's disk is per instance and discarded on restart, so
+        # documents kept in the instance folder would be lost; only the
+        # document routes are turned off, the rest of the app keeps working
+        persistent = "UPLOAD_DIR" in app.config or os.environ.get("UPLOAD_DIR")
+        app.config["UPLOADS_ENABLED"] = bool(persistent or not os.environ.get("REPLIT_DEPLOYMENT"))
+        if not app.config["UPLOADS_ENABLED"]:
+            app.logger.error("UPLOAD_DIR tidak diatur; unggah dokumen dinonaktifkan di deployment ini")
+    app.config.setdefault("UPLOAD_DIR", os.environ.get("UPLOAD_DIR") or os.path.join(app.instance_path, "uploads"))
+    app.config.setdefault("UPLOAD_MAX_BYTES", int(os.environ.get("UPLOAD_MAX_BYTES", 20 * 1024 * 1024)))
+    app.config.setdefault("UPLOAD_MAX_FILES", int(os.environ.get("UPLOAD_MAX_FILES", 5)))
+    app.config.setdefault("THUMBNAIL_WORKERS", int(os.environ.get("THUMBNAIL_WORKERS", 2)))
+    os.makedirs(os.path.join(app.config["UPLOAD_DIR"], "tmp"), exist_ok=True)